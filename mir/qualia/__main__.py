@@ -13,19 +13,81 @@
 # limitations under the License.
 
 import argparse
+import subprocess
 import sys
 
+from mir.qualia import profiling
 from mir.qualia import qualifier
+from mir.qualia import render
 
 
 def main():
+    # render-tree is a subcommand.  To pass render-tree as the first
+    # quality to the filter, put -- before the qualities.
+    if sys.argv[1:2] == ['render-tree']:
+        _render_tree_main(sys.argv[2:])
+        return
     parser = argparse.ArgumentParser()
     parser.add_argument('qualities', nargs='*')
+    parser.add_argument('--profile', action='store_true',
+                        help='report time spent per block to stderr')
+    parser.add_argument('--profile-top', type=int, default=10, metavar='N',
+                        help='number of slowest blocks to report')
+    parser.add_argument('--profile-stats', metavar='FILE',
+                        help='dump cProfile stats to FILE')
     args = parser.parse_args()
+    if args.profile or args.profile_stats:
+        _profile_main(args)
+        return
     qual = qualifier.Qualifier(args.qualities)
     for line in qual(sys.stdin):
         sys.stdout.write(line)
 
 
+def _profile_main(args):
+    with profiling.profiling(args.profile_stats) as profiler:
+        qual = qualifier.Qualifier(args.qualities, profiler=profiler)
+        with profiler.file('<stdin>'):
+            for line in qual(sys.stdin):
+                sys.stdout.write(line)
+    if args.profile:
+        profiler.report(sys.stderr, top=args.profile_top)
+
+
+def _render_tree_main(argv):
+    parser = argparse.ArgumentParser(prog='qualia render-tree')
+    parser.add_argument('qualities', nargs='*')
+    parser.add_argument('--rev', default='HEAD',
+                        help='Git revision to render')
+    parser.add_argument('--out', required=True, metavar='DIR',
+                        help='new or empty directory to write files to')
+    parser.add_argument('--filter', default='qualia', metavar='NAME',
+                        help='qualify files with the Git attribute '
+                        'filter=NAME')
+    parser.add_argument('-j', '--jobs', type=_positive_int, metavar='N',
+                        help='number of worker threads')
+    parser.add_argument('-v', '--verbose', action='store_true',
+                        help='report block cache hit rate to stderr')
+    args = parser.parse_args(argv)
+    try:
+        info = render.render_tree(args.rev, args.out, args.qualities,
+                                  jobs=args.jobs, filter_name=args.filter)
+    except (render.RenderError, subprocess.CalledProcessError) as e:
+        sys.exit(f'{parser.prog}: error: {e}')
+    if args.verbose:
+        lookups = info.hits + info.misses
+        rate = info.hits / lookups if lookups else 0.0
+        sys.stderr.write(f'Block cache: {info.hits}/{lookups} hits '
+                         f'({rate:.1%}), {info.currsize} cached blocks\n')
+
+
+def _positive_int(string):
+    """Parse a positive int argument."""
+    value = int(string)
+    if value < 1:
+        raise argparse.ArgumentTypeError(f'must be positive: {string}')
+    return value
+
+
 if __name__ == '__main__':
     main()
@@ -0,0 +1,109 @@
+# Copyright (C) 2017 Allen Li
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Memoize transformed qualified blocks.
+
+Classes:
+BlockCache
+CacheInfo
+"""
+
+import collections
+import threading
+
+CacheInfo = collections.namedtuple(
+    'CacheInfo', ['hits', 'misses', 'maxsize', 'currsize'])
+
+
+class BlockCache:
+
+    r"""Bounded least recently used cache of transformed blocks.
+
+    A BlockCache can be shared between Qualifier instances, so that
+    identical blocks appearing in many files are only transformed once.
+    Keys are (comment prefix, active flag, block lines) tuples; the block
+    lines are hashed for lookup and compared in full, so distinct blocks
+    never collide.  A BlockCache is safe to share between threads.
+
+    >>> cache = BlockCache(maxsize=2)
+    >>> key = ('#', True, ('#foo\n',))
+    >>> cache.get(key) is None
+    True
+    >>> cache.put(key, ['foo\n'])
+    >>> cache.get(key)
+    ('foo\n',)
+    >>> cache.info()
+    CacheInfo(hits=1, misses=1, maxsize=2, currsize=1)
+    """
+
+    def __init__(self, maxsize=1024):
+        if maxsize < 1:
+            raise ValueError(f'maxsize must be positive, not {maxsize!r}')
+        self._maxsize = maxsize
+        self._entries = collections.OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        cls = type(self).__qualname__
+        return f'{cls}(maxsize={self._maxsize!r})'
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Return the cached lines for key as a tuple, or None."""
+        with self._lock:
+            try:
+                lines = self._entries[key]
+            except KeyError:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+        return lines
+
+    def put(self, key, lines):
+        """Cache transformed lines for key.
+
+        The least recently used entry is evicted when the cache is full.
+        """
+        entries = self._entries
+        with self._lock:
+            entries[key] = tuple(lines)
+            entries.move_to_end(key)
+            if len(entries) > self._maxsize:
+                entries.popitem(last=False)
+
+    def info(self):
+        """Return a CacheInfo with the cache statistics."""
+        with self._lock:
+            return CacheInfo(self._hits, self._misses, self._maxsize,
+                             len(self._entries))
+
+    def hit_rate(self):
+        """Return the fraction of lookups that were hits."""
+        with self._lock:
+            hits, misses = self._hits, self._misses
+        if not hits + misses:
+            return 0.0
+        return hits / (hits + misses)
+
+    def clear(self):
+        """Remove all entries and reset the statistics."""
+        with self._lock:
+            self._entries.clear()
+            self._hits = 0
+            self._misses = 0
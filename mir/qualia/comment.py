@@ -77,6 +77,21 @@ class CommentPrefix:
             lines = self._force_uncomment(lines)
         return lines
 
+    def comment_depth(self, lines):
+        r"""Return how many levels of commenting the lines all share.
+
+        >>> prefix = CommentPrefix('#')
+        >>> prefix.comment_depth(['##foo\n', '###bar\n'])
+        2
+        """
+        depth = 0
+        if not lines:
+            return depth
+        while self.is_commented(lines):
+            lines = self._force_uncomment(lines)
+            depth += 1
+        return depth
+
     def _force_uncomment(self, lines):
         """Unconditionally uncomment a sequence of lines once."""
         return [self._prefix_pattern.sub(r'\g<indent>', line)
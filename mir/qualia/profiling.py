@@ -0,0 +1,183 @@
+# Copyright (C) 2017 Allen Li
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Profile qualifying files and blocks.
+
+Classes:
+Profiler
+FileTiming
+BlockTiming
+
+Functions:
+profiling
+"""
+
+import collections
+import contextlib
+import cProfile
+import time
+
+from mir.qualia.comment import CommentPrefix
+
+FileTiming = collections.namedtuple(
+    'FileTiming', ['path', 'blocks', 'elapsed'])
+BlockTiming = collections.namedtuple(
+    'BlockTiming',
+    ['path', 'lineno', 'prefix', 'quality', 'lines', 'depth', 'elapsed'])
+
+# Upper bounds in seconds of the latency histogram buckets.  The last
+# bucket has no upper bound.
+_HISTOGRAM_BOUNDS = (1e-5, 1e-4, 1e-3, 1e-2, 1e-1, 1)
+
+
+@contextlib.contextmanager
+def profiling(stats_file=None):
+    """Context manager that yields a Profiler.
+
+    Pass the Profiler to Qualifier to record block timings.  If
+    `stats_file` is given, the body is also run under cProfile and the
+    stats are dumped to `stats_file` on exit, for reading with pstats.
+    """
+    profiler = Profiler()
+    if stats_file is None:
+        yield profiler
+        return
+    prof = cProfile.Profile()
+    prof.enable()
+    try:
+        yield profiler
+    finally:
+        prof.disable()
+        prof.dump_stats(stats_file)
+
+
+class Profiler:
+
+    r"""Records wall time spent qualifying files and blocks.
+
+    >>> profiler = Profiler()
+    >>> with profiler.file('bashrc'):
+    ...     profiler.add_block(1, '#', 'laptop', ['#foo\n'], 0.5)
+    >>> profiler.blocks[0].quality
+    'laptop'
+    >>> profiler.files[0].blocks
+    1
+    """
+
+    def __init__(self):
+        self.files = []
+        self.blocks = []
+        self._path = None
+        # Time spent recording blocks, which is left out of file timings.
+        self._overhead = 0
+
+    def __repr__(self):
+        cls = type(self).__qualname__
+        return (f'{cls}(files={len(self.files)!r}, '
+                f'blocks={len(self.blocks)!r})')
+
+    @contextlib.contextmanager
+    def file(self, path):
+        """Context manager that times qualifying the file at path.
+
+        Blocks recorded inside the context are attributed to path.
+        """
+        self._path = path
+        nblocks = len(self.blocks)
+        overhead = self._overhead
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            elapsed -= self._overhead - overhead
+            self._path = None
+            self.files.append(
+                FileTiming(path, len(self.blocks) - nblocks, elapsed))
+
+    def add_block(self, lineno, prefix, quality, lines, elapsed):
+        """Record the time spent scanning and transforming a block.
+
+        `lineno` is the line number of the BEGIN line and `lines` are the
+        lines inside the block before transforming.  The time spent
+        recording the block is not counted in the file timing.
+        """
+        start = time.perf_counter()
+        depth = CommentPrefix(prefix).comment_depth(lines)
+        self.blocks.append(BlockTiming(
+            self._path, lineno, prefix, quality, len(lines), depth, elapsed))
+        self._overhead += time.perf_counter() - start
+
+    def slowest_blocks(self, n):
+        """Return the n slowest blocks, slowest first."""
+        return sorted(self.blocks, key=lambda b: b.elapsed, reverse=True)[:n]
+
+    def slowest_files(self, n):
+        """Return the n slowest files, slowest first."""
+        return sorted(self.files, key=lambda f: f.elapsed, reverse=True)[:n]
+
+    def histogram(self):
+        """Return a histogram of block latencies.
+
+        Return a list of (upper bound in seconds, count) pairs.  The upper
+        bound of the last bucket is None.
+        """
+        counts = [0] * (len(_HISTOGRAM_BOUNDS) + 1)
+        for block in self.blocks:
+            for i, bound in enumerate(_HISTOGRAM_BOUNDS):
+                if block.elapsed < bound:
+                    counts[i] += 1
+                    break
+            else:
+                counts[-1] += 1
+        return list(zip(_HISTOGRAM_BOUNDS + (None,), counts))
+
+    def report(self, file, top=10):
+        """Write a human readable report to a text file object."""
+        total = sum(f.elapsed for f in self.files)
+        file.write(f'{len(self.files)} files, {len(self.blocks)} blocks, '
+                   f'{total:.6f}s total\n')
+        file.write(f'\nTop {top} slowest files:\n')
+        for f in self.slowest_files(top):
+            file.write(f'{f.elapsed:12.6f}s  {f.blocks:6d} blocks  '
+                       f'{f.path}\n')
+        file.write(f'\nTop {top} slowest blocks:\n')
+        for b in self.slowest_blocks(top):
+            file.write(f'{b.elapsed:12.6f}s  {b.path}:{b.lineno}  '
+                       f'{b.prefix} BEGIN {b.quality}  '
+                       f'lines={b.lines} depth={b.depth}\n')
+        file.write('\nBlock latency histogram:\n')
+        for bound, count in self.histogram():
+            if bound is None:
+                label = f'>= {_format_seconds(_HISTOGRAM_BOUNDS[-1])}'
+            else:
+                label = f'<  {_format_seconds(bound)}'
+            file.write(f'{label:>10}  {count}\n')
+
+
+def _format_seconds(seconds):
+    """Format a histogram bound in seconds.
+
+    >>> _format_seconds(1e-5)
+    '10us'
+    >>> _format_seconds(0.1)
+    '100ms'
+    >>> _format_seconds(1)
+    '1s'
+    """
+    if seconds < 1e-3:
+        return f'{seconds * 1e6:.0f}us'
+    if seconds < 1:
+        return f'{seconds * 1e3:.0f}ms'
+    return f'{seconds:.0f}s'
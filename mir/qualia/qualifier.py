@@ -14,6 +14,7 @@
 
 import logging
 import re
+import time
 
 from mir.qualia.comment import CommentPrefix
 
@@ -35,10 +36,19 @@ class Qualifier:
     the qualities of the Qualifier instance.
 
     Qualifier is implemented as a generator, so processing is done lazily.
+
+    If a BlockCache is given as `cache`, transformed blocks are memoized in
+    it.  Share one cache between Qualifier instances to avoid transforming
+    the same block over and over when processing many files.
+
+    If a Profiler is given as `profiler`, the time spent scanning and
+    transforming each block is recorded in it.
     """
 
-    def __init__(self, qualities):
+    def __init__(self, qualities, cache=None, profiler=None):
         self._qualities = qualities
+        self._cache = cache
+        self._profiler = profiler
 
     def __repr__(self):
         cls = type(self).__qualname__
@@ -49,27 +59,30 @@ class Qualifier:
 
         `lines` is an iterable of strings.
         """
-        lines = iter(lines)
+        lines = enumerate(lines, 1)
         from_begin_line = _BlockAttributes.from_begin_line
-        for line in lines:
+        for lineno, line in lines:
             logger.debug('Yielding line %r', line)
             yield line
             block_attrs = from_begin_line(line)
             if block_attrs:
                 logger.debug('Entering block')
-                yield from self._qualify_block(block_attrs, lines)
+                yield from self._qualify_block(block_attrs, lineno, lines)
 
-    def _qualify_block(self, attrs, rest):
+    def _qualify_block(self, attrs, begin_lineno, rest):
         """Qualify lines in a block.
 
-        `attrs` is a _BlockAttributes instance.  `rest` is an iterator of
-        remaining lines.
+        `attrs` is a _BlockAttributes instance.  `begin_lineno` is the line
+        number of the BEGIN line.  `rest` is an iterator of remaining
+        (line number, line) pairs.
         """
+        start = time.perf_counter()
         block_lines = []
         is_end_line = attrs.is_end_line
-        for line in rest:
+        for _, line in rest:
             if is_end_line(line):
-                yield from self._close_qualified_block(attrs, block_lines)
+                yield from self._close_qualified_block(
+                    attrs, begin_lineno, block_lines, start)
                 logger.debug('Yielding %r', line)
                 yield line
                 break
@@ -83,18 +96,50 @@ class Qualifier:
             logger.debug('Reached end, dumping lines')
             yield from block_lines
 
-    def _close_qualified_block(self, attrs, block_lines):
+    def _close_qualified_block(self, attrs, begin_lineno, block_lines,
+                               start):
         """Emit the lines of the parse qualified block according to qualities.
 
         Args:
             attrs: A _BlockAttributes instance.
+            begin_lineno: The line number of the BEGIN line.
             block_lines: A sequence of lines inside the block.
+            start: The time.perf_counter() value when the block was entered.
         """
-        prefix = attrs.get_comment_prefix()
-        if attrs.is_active(self._qualities):
-            yield from prefix.uncomment(block_lines)
-        else:
-            yield from prefix.comment(block_lines)
+        profiler = self._profiler
+        if profiler is None:
+            yield from self._transform(attrs, block_lines)
+            return
+        lines = self._transform(attrs, block_lines)
+        elapsed = time.perf_counter() - start
+        profiler.add_block(begin_lineno, attrs.prefix, attrs.quality,
+                           block_lines, elapsed)
+        yield from lines
+
+    def _transform(self, attrs, block_lines):
+        """Return the transformed lines of a block, using the cache."""
+        active = attrs.is_active(self._qualities)
+        cache = self._cache
+        if cache is None:
+            return _transform_block(attrs, active, block_lines)
+        key = (attrs.prefix, active, tuple(block_lines))
+        lines = cache.get(key)
+        if lines is None:
+            lines = _transform_block(attrs, active, block_lines)
+            cache.put(key, lines)
+        return lines
+
+
+def _transform_block(attrs, active, block_lines):
+    """Comment or uncomment the lines of a block.
+
+    Return a list of the transformed lines.
+    """
+    prefix = attrs.get_comment_prefix()
+    if active:
+        return prefix.uncomment(block_lines)
+    else:
+        return prefix.comment(block_lines)
 
 
 class _BlockAttributes:
@@ -133,6 +178,16 @@ class _BlockAttributes:
         else:
             return None
 
+    @property
+    def prefix(self):
+        """The comment prefix of the block."""
+        return self._prefix
+
+    @property
+    def quality(self):
+        """The quality name of the block."""
+        return self._quality
+
     def is_end_line(self, line):
         """Return a true value if line is an end line for this block."""
         return self._end_pattern.search(line)
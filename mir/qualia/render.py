@@ -0,0 +1,253 @@
+# Copyright (C) 2017 Allen Li
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Render a qualified Git revision to a directory.
+
+Functions:
+render_tree
+
+Exceptions:
+RenderError
+"""
+
+import collections
+import concurrent.futures
+import contextlib
+import io
+import logging
+import os
+import subprocess
+import tempfile
+import threading
+
+from mir.qualia.cache import BlockCache
+from mir.qualia.qualifier import Qualifier
+
+logger = logging.getLogger(__name__)
+
+_TreeEntry = collections.namedtuple('_TreeEntry', ['mode', 'sha', 'path'])
+
+_SYMLINK_MODE = '120000'
+_EXECUTABLE_MODE = '100755'
+
+# Number of blobs per worker that may be waiting to be written, to bound
+# how much of the revision is held in memory.
+_PENDING_PER_JOB = 4
+
+
+class RenderError(Exception):
+    """Error rendering a tree."""
+
+
+def render_tree(rev, out_dir, qualities, jobs=None, cwd=None,
+                filter_name='qualia'):
+    """Write the files of a Git revision to out_dir, qualified.
+
+    out_dir must not exist or be an empty directory.
+
+    The files are listed with a single `git ls-tree` and read through a
+    single `git cat-file --batch` process.  Like a checkout, only files
+    with the Git attribute `filter` set to `filter_name` are qualified;
+    other files are written as is.  Files are qualified and written by a
+    pool of `jobs` worker threads.  Submodules are skipped.
+
+    `cwd` is the directory to run Git in; it defaults to the current
+    directory.
+
+    Return a CacheInfo with the statistics of the block cache shared by
+    all files.
+    """
+    entries = list(_list_tree(rev, cwd))
+    filtered = _filtered_paths(rev, entries, filter_name, cwd)
+    _make_out_dir(out_dir)
+    umask = _get_umask()
+    cache = BlockCache()
+    qual = Qualifier(qualities, cache=cache)
+    if jobs is None:
+        jobs = min(32, (os.cpu_count() or 1) + 4)
+    max_pending = jobs * _PENDING_PER_JOB
+    with concurrent.futures.ThreadPoolExecutor(jobs) as pool, \
+            contextlib.closing(_cat_blobs(entries, cwd)) as blobs:
+        pending = set()
+        for entry, data in blobs:
+            if len(pending) >= max_pending:
+                pending = _wait_pending(
+                    pending, concurrent.futures.FIRST_COMPLETED)
+            pending.add(pool.submit(
+                _write_entry, qual, out_dir, umask, entry, data,
+                entry.path in filtered))
+        _wait_pending(pending, concurrent.futures.ALL_COMPLETED)
+    return cache.info()
+
+
+def _make_out_dir(out_dir):
+    """Create out_dir, which must not exist or be empty."""
+    try:
+        os.makedirs(out_dir, exist_ok=True)
+        nonempty = bool(os.listdir(out_dir))
+    except OSError as e:
+        raise RenderError(f'cannot use output directory {out_dir}: {e}')
+    if nonempty:
+        raise RenderError(f'output directory {out_dir} is not empty')
+
+
+def _get_umask():
+    """Return the process umask."""
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+
+def _wait_pending(pending, return_when):
+    """Wait for pending futures and raise the first error.
+
+    Return the set of futures that are still pending.
+    """
+    done, pending = concurrent.futures.wait(pending, return_when=return_when)
+    for future in done:
+        future.result()
+    return pending
+
+
+def _list_tree(rev, cwd):
+    """Generate _TreeEntry instances for the blobs in a revision."""
+    output = subprocess.run(
+        ['git', 'ls-tree', '-r', '-z', rev],
+        stdout=subprocess.PIPE, check=True, cwd=cwd).stdout
+    for record in output.split(b'\0'):
+        if not record:
+            continue
+        info, path = record.split(b'\t', 1)
+        mode, kind, sha = info.decode().split()
+        if kind != 'blob':
+            logger.debug('Skipping %s %r', kind, path)
+            continue
+        yield _TreeEntry(mode, sha, os.fsdecode(path))
+
+
+def _filtered_paths(rev, entries, filter_name, cwd):
+    """Return the set of paths whose filter attribute is filter_name.
+
+    Attributes are read from the .gitattributes files in rev, by loading
+    rev into a temporary index.
+    """
+    with tempfile.TemporaryDirectory() as tmpdir:
+        env = dict(os.environ, GIT_INDEX_FILE=os.path.join(tmpdir, 'index'))
+        subprocess.run(['git', 'read-tree', rev],
+                       env=env, check=True, cwd=cwd)
+        paths = b''.join(os.fsencode(entry.path) + b'\0'
+                         for entry in entries)
+        output = subprocess.run(
+            ['git', 'check-attr', '--cached', '-z', '--stdin', 'filter'],
+            input=paths, stdout=subprocess.PIPE, env=env, check=True,
+            cwd=cwd).stdout
+    fields = output.split(b'\0')
+    value = filter_name.encode()
+    return {os.fsdecode(path)
+            for path, _, attr_value in zip(*[iter(fields)] * 3)
+            if attr_value == value}
+
+
+def _cat_blobs(entries, cwd):
+    """Generate (entry, blob contents) pairs for entries in order.
+
+    All blobs are read through a single `git cat-file --batch` process.
+    """
+    proc = subprocess.Popen(
+        ['git', 'cat-file', '--batch'],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, cwd=cwd)
+    # Feed object names from another thread so that neither pipe can fill
+    # up and deadlock the process.
+    writer = threading.Thread(
+        target=_write_shas, args=(proc.stdin, entries), daemon=True)
+    writer.start()
+    unread = None
+    try:
+        for entry in entries:
+            line = proc.stdout.readline()
+            if not line:
+                unread = entry
+                break
+            header = line.split()
+            if len(header) != 3:
+                raise RenderError(f'cannot read blob {entry.sha}: {line!r}')
+            data = proc.stdout.read(int(header[2]))
+            proc.stdout.read(1)  # Trailing newline
+            yield entry, data
+    except BaseException:
+        proc.kill()
+        raise
+    finally:
+        proc.stdout.close()
+        returncode = proc.wait()
+        writer.join()
+    if returncode:
+        raise subprocess.CalledProcessError(returncode, proc.args)
+    if unread is not None:
+        raise RenderError(f'cat-file exited before blob {unread.sha}')
+
+
+def _write_shas(file, entries):
+    """Write the object names for entries to a cat-file process."""
+    try:
+        for entry in entries:
+            file.write(f'{entry.sha}\n'.encode())
+    except BrokenPipeError:
+        pass
+    finally:
+        try:
+            file.close()
+        except BrokenPipeError:
+            pass
+
+
+def _write_entry(qual, out_dir, umask, entry, data, filtered):
+    """Write a tree entry to out_dir.
+
+    The contents are qualified if filtered is true.  Executable files get
+    the execute bits allowed by umask, like in a Git checkout.
+    """
+    path = os.path.join(out_dir, entry.path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if entry.mode == _SYMLINK_MODE:
+        os.symlink(os.fsdecode(data), path)
+        return
+    if filtered:
+        data = _qualify_blob(qual, data)
+    with open(path, 'wb') as file:
+        file.write(data)
+    if entry.mode == _EXECUTABLE_MODE:
+        mode = os.stat(path).st_mode
+        os.chmod(path, mode | (0o111 & ~umask))
+
+
+def _qualify_blob(qual, data):
+    r"""Qualify the contents of a blob.
+
+    Blobs without BEGIN lines or that aren't UTF-8 are returned unchanged.
+
+    >>> qual = Qualifier(['spam'])
+    >>> _qualify_blob(qual, b'# BEGIN spam\r\n#spam\r\n# END spam\r\n')
+    b'# BEGIN spam\r\nspam\r\n# END spam\r\n'
+    >>> _qualify_blob(qual, b'\xff BEGIN')
+    b'\xff BEGIN'
+    """
+    if b'BEGIN' not in data:
+        return data
+    try:
+        text = data.decode()
+    except UnicodeDecodeError:
+        return data
+    lines = io.StringIO(text, newline='\n')
+    return ''.join(qual(lines)).encode()
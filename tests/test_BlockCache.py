@@ -0,0 +1,70 @@
+import pytest
+
+from mir.qualia.cache import BlockCache
+from mir.qualia.cache import CacheInfo
+
+
+def test_BlockCache_repr():
+    cache = BlockCache(maxsize=5)
+    assert repr(cache) == 'BlockCache(maxsize=5)'
+
+
+def test_BlockCache_invalid_maxsize():
+    with pytest.raises(ValueError):
+        BlockCache(maxsize=0)
+
+
+def test_get_miss():
+    cache = BlockCache()
+    assert cache.get(('#', True, ('foo',))) is None
+    assert cache.info() == CacheInfo(hits=0, misses=1, maxsize=1024,
+                                     currsize=0)
+
+
+def test_get_hit():
+    cache = BlockCache()
+    cache.put(('#', True, ('#foo',)), ['foo'])
+    assert cache.get(('#', True, ('#foo',))) == ('foo',)
+    assert cache.info() == CacheInfo(hits=1, misses=0, maxsize=1024,
+                                     currsize=1)
+
+
+def test_get_returns_cached_tuple():
+    cache = BlockCache()
+    cache.put(('#', True, ('#foo',)), ['foo'])
+    first = cache.get(('#', True, ('#foo',)))
+    assert cache.get(('#', True, ('#foo',))) is first
+
+
+def test_evicts_least_recently_used():
+    cache = BlockCache(maxsize=2)
+    cache.put('spam', ['spam'])
+    cache.put('eggs', ['eggs'])
+    cache.get('spam')
+    cache.put('ham', ['ham'])
+    assert len(cache) == 2
+    assert cache.get('eggs') is None
+    assert cache.get('spam') == ('spam',)
+    assert cache.get('ham') == ('ham',)
+
+
+def test_hit_rate():
+    cache = BlockCache()
+    cache.put('spam', ['spam'])
+    cache.get('spam')
+    cache.get('eggs')
+    assert cache.hit_rate() == 0.5
+
+
+def test_hit_rate_no_lookups():
+    cache = BlockCache()
+    assert cache.hit_rate() == 0.0
+
+
+def test_clear():
+    cache = BlockCache()
+    cache.put('spam', ['spam'])
+    cache.get('spam')
+    cache.clear()
+    assert cache.info() == CacheInfo(hits=0, misses=0, maxsize=1024,
+                                     currsize=0)
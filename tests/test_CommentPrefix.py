@@ -101,3 +101,18 @@ def test_comment_skip_common_indent():
 def test_CommentPrefix_repr():
     finder = CommentPrefix('#')
     assert repr(finder) == "CommentPrefix('#')"
+
+
+def test_comment_depth_empty():
+    prefix = CommentPrefix('#')
+    assert prefix.comment_depth([]) == 0
+
+
+def test_comment_depth_uncommented():
+    prefix = CommentPrefix('#')
+    assert prefix.comment_depth(['foo', '#bar']) == 0
+
+
+def test_comment_depth():
+    prefix = CommentPrefix('#')
+    assert prefix.comment_depth(['##foo', ' ###bar']) == 2
@@ -3,6 +3,7 @@ import collections
 import pytest
 
 from mir.qualia import qualifier
+from mir.qualia.cache import BlockCache
 
 
 def test_qualifier_repr():
@@ -112,3 +113,37 @@ def test_qualifier_no_whitespace_before_keyword():
         'spam\n',
         '#END spam\n',
     ]
+
+
+def test_qualifier_cache_shared():
+    cache = BlockCache()
+    lines = [
+        '# BEGIN spam\n',
+        'spam\n',
+        '# END spam\n',
+    ]
+    first = list(qualifier.Qualifier([], cache=cache)(lines))
+    second = list(qualifier.Qualifier([], cache=cache)(lines))
+    assert first == second == [
+        '# BEGIN spam\n',
+        '#spam\n',
+        '# END spam\n',
+    ]
+    assert cache.info().hits == 1
+
+
+def test_qualifier_cache_keyed_on_active():
+    cache = BlockCache()
+    lines = [
+        '# BEGIN spam\n',
+        '#spam\n',
+        '# END spam\n',
+    ]
+    list(qualifier.Qualifier([], cache=cache)(lines))
+    got = list(qualifier.Qualifier(['spam'], cache=cache)(lines))
+    assert got == [
+        '# BEGIN spam\n',
+        'spam\n',
+        '# END spam\n',
+    ]
+    assert cache.info().hits == 0
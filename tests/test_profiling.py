@@ -0,0 +1,95 @@
+import io
+import pstats
+
+from mir.qualia import profiling
+from mir.qualia import qualifier
+
+
+def test_Profiler_repr():
+    profiler = profiling.Profiler()
+    assert repr(profiler) == 'Profiler(files=0, blocks=0)'
+
+
+def test_qualifier_records_blocks():
+    profiler = profiling.Profiler()
+    qual = qualifier.Qualifier(['spam'], profiler=profiler)
+    with profiler.file('bashrc'):
+        list(qual([
+            'foo\n',
+            '# BEGIN spam\n',
+            '##spam\n',
+            '##eggs\n',
+            '# END spam\n',
+            '# BEGIN eggs\n',
+            '# END eggs\n',
+        ]))
+    first, second = profiler.blocks
+    assert first._replace(elapsed=0) == profiling.BlockTiming(
+        path='bashrc', lineno=2, prefix='#', quality='spam', lines=2,
+        depth=2, elapsed=0)
+    assert second.lineno == 6
+    assert second.lines == 0
+    file, = profiler.files
+    assert file.path == 'bashrc'
+    assert file.blocks == 2
+
+
+def test_qualifier_skips_unclosed_blocks():
+    profiler = profiling.Profiler()
+    qual = qualifier.Qualifier([], profiler=profiler)
+    list(qual([
+        '# BEGIN spam\n',
+        'spam\n',
+    ]))
+    assert profiler.blocks == []
+
+
+def test_slowest_blocks():
+    profiler = profiling.Profiler()
+    for elapsed in (0.2, 0.5, 0.1):
+        profiler.add_block(1, '#', 'spam', [], elapsed)
+    got = [b.elapsed for b in profiler.slowest_blocks(2)]
+    assert got == [0.5, 0.2]
+
+
+def test_histogram():
+    profiler = profiling.Profiler()
+    for elapsed in (1e-6, 5e-6, 2e-3, 5):
+        profiler.add_block(1, '#', 'spam', [], elapsed)
+    assert profiler.histogram() == [
+        (1e-5, 2),
+        (1e-4, 0),
+        (1e-3, 0),
+        (1e-2, 1),
+        (1e-1, 0),
+        (1, 0),
+        (None, 1),
+    ]
+
+
+def test_report():
+    profiler = profiling.Profiler()
+    with profiler.file('bashrc'):
+        profiler.add_block(3, '#', 'spam', ['#spam\n'], 0.25)
+    file = io.StringIO()
+    profiler.report(file, top=5)
+    got = file.getvalue()
+    assert 'Top 5 slowest blocks:' in got
+    assert 'bashrc:3  # BEGIN spam  lines=1 depth=1' in got
+
+
+def test_profiling_dumps_stats(tmpdir):
+    path = str(tmpdir.join('qualia.prof'))
+    with profiling.profiling(path) as profiler:
+        qual = qualifier.Qualifier([], profiler=profiler)
+        list(qual(['# BEGIN spam\n', 'spam\n', '# END spam\n']))
+    stats = pstats.Stats(path)
+    assert stats.total_calls > 0
+
+
+def test_add_block_records_depth():
+    profiler = profiling.Profiler()
+    lines = ['##spam\n']
+    profiler.add_block(1, '#', 'spam', lines, 0.1)
+    lines.append('eggs\n')
+    assert profiler.blocks[0].depth == 2
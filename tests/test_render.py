@@ -0,0 +1,123 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from mir.qualia import __main__
+from mir.qualia import render
+
+
+def _git(repo, *args):
+    env = dict(os.environ,
+               GIT_AUTHOR_NAME='qualia', GIT_AUTHOR_EMAIL='qualia@example.com',
+               GIT_COMMITTER_NAME='qualia',
+               GIT_COMMITTER_EMAIL='qualia@example.com')
+    subprocess.run(['git', *args], cwd=repo, env=env, check=True,
+                   stdout=subprocess.DEVNULL)
+
+
+@pytest.fixture
+def repo(tmpdir):
+    repo = tmpdir.mkdir('repo')
+    _git(str(repo), 'init', '-q')
+    repo.join('.gitattributes').write('bashrc filter=qualia\n'
+                                      'binary filter=qualia\n')
+    repo.join('bashrc').write('# BEGIN spam\nspam\n# END spam\n')
+    repo.join('notes.md').write('# BEGIN spam\nspam\n# END spam\n')
+    repo.mkdir('bin').join('run').write('#!/bin/sh\n')
+    repo.join('bin', 'run').chmod(0o755)
+    repo.join('binary').write_binary(b'\xff BEGIN spam\n')
+    os.symlink('bashrc', str(repo.join('link')))
+    _git(str(repo), 'add', '.')
+    _git(str(repo), 'commit', '-q', '-m', 'Initial commit')
+    return repo
+
+
+def test_render_tree(repo, tmpdir):
+    out = tmpdir.join('out')
+    render.render_tree('HEAD', str(out), [], cwd=str(repo))
+    assert out.join('bashrc').read() == '# BEGIN spam\n#spam\n# END spam\n'
+    assert out.join('bin', 'run').read() == '#!/bin/sh\n'
+    assert os.access(str(out.join('bin', 'run')), os.X_OK)
+    assert out.join('binary').read_binary() == b'\xff BEGIN spam\n'
+    assert os.readlink(str(out.join('link'))) == 'bashrc'
+
+
+def test_render_tree_returns_cache_info(repo, tmpdir):
+    out = tmpdir.join('out')
+    info = render.render_tree('HEAD', str(out), [], cwd=str(repo))
+    assert info.misses == 1
+
+
+def test_render_tree_skips_unfiltered(repo, tmpdir):
+    out = tmpdir.join('out')
+    render.render_tree('HEAD', str(out), [], cwd=str(repo))
+    assert out.join('notes.md').read() == '# BEGIN spam\nspam\n# END spam\n'
+
+
+def test_render_tree_empty_out_dir(repo, tmpdir):
+    out = tmpdir.mkdir('out')
+    render.render_tree('HEAD', str(out), [], cwd=str(repo))
+    assert out.join('bashrc').check()
+
+
+def test_render_tree_nonempty_out_dir(repo, tmpdir):
+    out = tmpdir.mkdir('out')
+    out.join('stale').write('')
+    with pytest.raises(render.RenderError):
+        render.render_tree('HEAD', str(out), [], cwd=str(repo))
+
+
+def test_render_tree_out_is_file(repo, tmpdir):
+    out = tmpdir.join('out')
+    out.write('')
+    with pytest.raises(render.RenderError):
+        render.render_tree('HEAD', str(out), [], cwd=str(repo))
+
+
+def test_render_tree_executable_umask(repo, tmpdir):
+    out = tmpdir.join('out')
+    umask = os.umask(0o027)
+    try:
+        render.render_tree('HEAD', str(out), [], cwd=str(repo))
+    finally:
+        os.umask(umask)
+    assert os.stat(str(out.join('bin', 'run'))).st_mode & 0o777 == 0o750
+
+
+def test_render_tree_bad_rev(repo, tmpdir):
+    out = tmpdir.join('out')
+    with pytest.raises(subprocess.CalledProcessError):
+        render.render_tree('nonexistent', str(out), [], cwd=str(repo))
+    assert not out.check()
+
+
+def test_cat_blobs_missing_blob(repo):
+    entries = [render._TreeEntry('100644', '0' * 40, 'spam')]
+    with pytest.raises(render.RenderError):
+        list(render._cat_blobs(entries, str(repo)))
+
+
+def test_cat_blobs_failed(tmpdir):
+    entries = [render._TreeEntry('100644', '0' * 40, 'spam')]
+    with pytest.raises(subprocess.CalledProcessError):
+        list(render._cat_blobs(entries, str(tmpdir)))
+
+
+def test_render_tree_main_error(repo, tmpdir, monkeypatch):
+    monkeypatch.chdir(str(repo))
+    monkeypatch.setattr(sys, 'argv', [
+        'qualia', 'render-tree', '--rev', 'nonexistent',
+        '--out', str(tmpdir.join('out'))])
+    with pytest.raises(SystemExit) as excinfo:
+        __main__.main()
+    assert excinfo.value.code != 0
+
+
+def test_render_tree_main_bad_jobs(repo, tmpdir, monkeypatch):
+    monkeypatch.setattr(sys, 'argv', [
+        'qualia', 'render-tree', '-j', '0', '--out', str(tmpdir.join('out'))])
+    with pytest.raises(SystemExit) as excinfo:
+        __main__.main()
+    assert excinfo.value.code == 2